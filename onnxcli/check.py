@@ -1,5 +1,4 @@
 import logging
-import onnx
 from onnxcli.common import SubCmd
 
 logger = logging.getLogger('onnxcli')
@@ -16,4 +15,6 @@ class CheckCmd(SubCmd):
     def run(self, args):
         logger.info("Running <Checker> on model {}".format(args.path))
 
+        import onnx
+
         onnx.checker.check_model(args.path)
@@ -1,3 +1,6 @@
+import functools
+
+
 class SubCmd:
     subcmd = None
 
@@ -24,6 +27,7 @@ class SubCmd:
         raise RuntimeError("{}.run() need to be overrided!".format(self.__name__))
 
 
+@functools.lru_cache(maxsize=32)
 def dtype(Key):
     # sync with TensorProto.DataType of https:#github.com/onnx/onnx/blob/master/onnx/onnx.proto
     RawMap = [
@@ -51,7 +55,5 @@ def dtype(Key):
 
 
 def shape(ShapeProto):
-    def not_empty_str(s):
-        return s is not None and len(s) != 0
-
-    return [d.dim_param if not_empty_str(d.dim_param) else d.dim_value for d in ShapeProto.dim]
+    # dim_param is an empty string rather than None if not set
+    return [d.dim_param if d.dim_param else d.dim_value for d in ShapeProto.dim]
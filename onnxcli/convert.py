@@ -1,5 +1,4 @@
 import logging
-import onnx
 import os
 from onnxcli.common import SubCmd
 
@@ -45,6 +44,8 @@ def onnx2json(input_path, output_path):
         logger.error("Failed to import protobuf. Try to fix with `onnx setup`.")
         raise err
 
+    import onnx
+
     m = onnx.load(input_path)
     msg = MessageToJson(m)
     j = json.loads(msg)
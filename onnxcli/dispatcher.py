@@ -1,21 +1,26 @@
 """The main command dispatcher"""
 
 import argparse
+import importlib
 import logging
 import sys
 
 from onnxcli import __doc__ as DESCRIPTION
-from onnxcli.check import CheckCmd
-from onnxcli.convert import ConvertCmd
-from onnxcli.draw import DrawCmd
-from onnxcli.extract import ExtractCmd
-from onnxcli.infer_shape import InferShapeCmd
-from onnxcli.inspect import InspectCmd
-from onnxcli.optimize import OptimizeCmd
-from onnxcli.setup import SetupCmd
 
 logger = logging.getLogger('onnxcli')
 
+# subcommand -> 'module:class', the module is imported only when the subcommand is requested.
+SUBCMDS = {
+    'check': 'onnxcli.check:CheckCmd',
+    'convert': 'onnxcli.convert:ConvertCmd',
+    'draw': 'onnxcli.draw:DrawCmd',
+    'extract': 'onnxcli.extract:ExtractCmd',
+    'infershape': 'onnxcli.infer_shape:InferShapeCmd',
+    'inspect': 'onnxcli.inspect:InspectCmd',
+    'optimize': 'onnxcli.optimize:OptimizeCmd',
+    'setup': 'onnxcli.setup:SetupCmd',
+}
+
 
 def dispatch():
     dispatch_core(sys.argv[1:])
@@ -27,14 +32,30 @@ def dispatch_core(*raw_args):
     parser = argparse.ArgumentParser(description=DESCRIPTION)
     subparsers = parser.add_subparsers(title='subcommands')
 
-    CheckCmd(subparsers)
-    ConvertCmd(subparsers)
-    DrawCmd(subparsers)
-    ExtractCmd(subparsers)
-    InferShapeCmd(subparsers)
-    InspectCmd(subparsers)
-    OptimizeCmd(subparsers)
-    SetupCmd(subparsers)
+    argv = raw_args[0] if len(raw_args) > 0 else sys.argv[1:]
+    subcmd = _sniff_subcommand(argv)
+    if subcmd is not None:
+        _load_subcmd(subcmd)(subparsers)
+    else:
+        # for help or invalid subcommand, only the description of the subcommands is needed.
+        for name in SUBCMDS:
+            subparsers.add_parser(name, help=_load_subcmd(name).__doc__)
 
     args = parser.parse_args(*raw_args)
+    if not hasattr(args, 'func'):
+        parser.print_help()
+        return
     args.func(args)
+
+
+def _sniff_subcommand(argv):
+    """Return the requested subcommand if it is a known one, otherwise None."""
+    for arg in argv:
+        if not arg.startswith('-'):
+            return arg if arg in SUBCMDS else None
+    return None
+
+
+def _load_subcmd(name):
+    module_name, class_name = SUBCMDS[name].split(':')
+    return getattr(importlib.import_module(module_name), class_name)
@@ -2,7 +2,6 @@ import logging
 import tempfile
 import subprocess
 import shlex
-import onnx
 from onnxcli.common import SubCmd, dtype, shape
 
 logger = logging.getLogger('onnxcli')
@@ -66,6 +65,8 @@ class DrawCmd(SubCmd):
         def node_key(name):
             return 'node_' + fixname(name)
 
+        import onnx
+
         m = onnx.load_model(input_path)
         dot_str = "digraph onnxcli {\n"
 
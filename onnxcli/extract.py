@@ -1,5 +1,4 @@
 import logging
-import onnx
 import os
 
 from onnxcli.common import SubCmd
@@ -42,6 +41,9 @@ class ExtractCmd(SubCmd):
             raise ValueError("Output model path shall not be empty!")
         if len(args.output_names) == 0:
             raise ValueError("Output tensor names shall not be empty!")
+
+        import onnx
+
         try:
             onnx.checker.check_model(args.input_path)
         except Exception as e:
@@ -55,6 +57,8 @@ class ExtractCmd(SubCmd):
 
 class Extractor:
     def __init__(self, model):
+        import onnx
+
         self.model = onnx.shape_inference.infer_shapes(model)
         self.graph = self.model.graph
         self.wmap = self._build_name2obj_dict(self.graph.initializer)
@@ -123,6 +127,8 @@ class Extractor:
         return (initializer, value_info)
 
     def _make_model(self, nodes, inputs, outputs, initializer, value_info):
+        import onnx
+
         name = 'Extracted from {' + self.graph.name + '}'
         graph = onnx.helper.make_graph(nodes, name, inputs, outputs, initializer=initializer, value_info=value_info)
 
@@ -1,5 +1,4 @@
 import logging
-import onnx
 from onnxcli.common import SubCmd
 
 logger = logging.getLogger('onnxcli')
@@ -17,6 +16,8 @@ class InferShapeCmd(SubCmd):
     def run(self, args):
         logger.info("Running <Shape Inference> on model {}".format(args.input_path))
 
+        import onnx
+
         if args.output_path:
             onnx.shape_inference.infer_shapes_path(args.input_path, args.output_path)
         else:
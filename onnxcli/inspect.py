@@ -1,9 +1,37 @@
+import glob
+import hashlib
+import itertools
 import logging
-import onnx
+import mmap
+import os
+import sys
+import tempfile
 from onnxcli.common import SubCmd, dtype, shape
 
 logger = logging.getLogger('onnxcli')
 
+SEPARATOR = "-" * 80
+
+# number of leading and trailing elements to print when summarizing the data of a tensor
+SUMMARY_ITEMS = 8
+
+# models larger than this are parsed from a memory map of the file
+MMAP_THRESHOLD = 256 * 1024 * 1024
+
+# models larger than this are cached without tensor data to speed up repeated inspection
+CACHE_THRESHOLD = 64 * 1024 * 1024
+
+# the fields of TensorProto that hold the data
+TENSOR_DATA_FIELDS = [
+    'float_data',
+    'int32_data',
+    'string_data',
+    'int64_data',
+    'raw_data',
+    'double_data',
+    'uint64_data',
+]
+
 
 class InspectCmd(SubCmd):
     """Prints the information of nodes tensors of the given model.
@@ -64,194 +92,303 @@ class InspectCmd(SubCmd):
             help="Print detailed information of the nodes or tensors that specified by --indices or --names."
             " Warning: will print the data of tensors.",
         )
+        subparser.add_argument(
+            '-f',
+            '--full-data',
+            action='store_true',
+            help="Print all the data of the tensors when --detail is set, rather than a summary of it.",
+        )
+        subparser.add_argument(
+            '-c',
+            '--check',
+            action='store_true',
+            help="Check the model with ONNX checker (without shape inference) before inspecting."
+            " Can be slow for large models.",
+        )
+        subparser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help="Do not use or update the cached copy (without tensor data) of large models,"
+            " which is kept in $XDG_CACHE_HOME/onnxcli (~/.cache/onnxcli by default).",
+        )
 
     def run(self, args):
         logger.info("Running <Inspect> on model {}".format(args.input_path))
         has_indices = len(args.indices) != 0
         has_names = len(args.names) != 0
-        no_tensor_or_node = args.node is None and args.tensor is None
+        no_tensor_or_node = not args.node and not args.tensor
         if has_indices and has_names:
             raise ValueError("Can NOT set both --indices and --names")
-        if (has_indices or has_indices) and no_tensor_or_node:
+        if (has_indices or has_names) and no_tensor_or_node:
             raise ValueError("Can NOT set --indices or --names without --node or --tensor")
         if (not has_indices and not has_names) and args.detail:
             raise ValueError("Can NOT set --detail without --indices or --names")
+        if args.full_data and not args.detail:
+            raise ValueError("Can NOT set --full-data without --detail")
 
-        try:
-            onnx.checker.check_model(args.input_path)
-        except Exception:
-            logger.warning("Failed to check model {}, statistic could be inaccurate!".format(args.input_path))
-        m = onnx.load_model(args.input_path)
-        g = m.graph
-        printed_any = False
-
+        # decide what to print before loading the model, which determines how to load it
+        actions = []
         if args.meta:
-            print_meta(m)
-            printed_any = True
-
+            actions.append(('meta', print_meta))
         if args.node:
-            print_nodes(g, args.indices, args.names, args.detail)
-            printed_any = True
-
+            actions.append(('node', lambda m: print_nodes(m.graph, args.indices, args.names, args.detail)))
         if args.tensor:
-            print_tensor(g, args.indices, args.names, args.detail)
-            printed_any = True
-
+            actions.append(
+                ('tensor', lambda m: print_tensor(m.graph, args.indices, args.names, args.detail, args.full_data))
+            )
         if args.io:
-            print_io(g)
-            printed_any = True
+            actions.append(('io', lambda m: print_io(m.graph)))
+        if len(actions) == 0:
+            actions.append(('basic', lambda m: print_basic(m.graph)))
+
+        import onnx
+
+        if args.check:
+            try:
+                # skip the shape inference of full check, which can be expensive
+                onnx.checker.check_model(args.input_path, full_check=False)
+            except Exception:
+                logger.warning("Failed to check model {}, statistic could be inaccurate!".format(args.input_path))
+
+        # the external data is only needed when printing the data of tensors
+        need_tensor_data = args.detail and any(name == 'tensor' for name, _ in actions)
+        if args.no_cache or need_tensor_data:
+            m = load_model(args.input_path, need_tensor_data)
+        else:
+            m = load_model_cached(args.input_path)
+
+        for _, action in actions:
+            action(m)
+
 
-        if not printed_any:
-            print_basic(g)
+def load_model(path, load_external_data):
+    import onnx
+
+    if os.path.getsize(path) <= MMAP_THRESHOLD:
+        return onnx.load_model(path, load_external_data=load_external_data)
+
+    # avoid reading the whole file into a bytes object before parsing
+    logger.debug("Parsing model {} from memory map".format(path))
+    m = onnx.ModelProto()
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+            m.ParseFromString(buf)
+    if load_external_data:
+        from onnx.external_data_helper import load_external_data_for_model
+
+        load_external_data_for_model(m, os.path.dirname(path))
+    return m
+
+
+def cache_dir():
+    return os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'onnxcli')
+
+
+def load_model_cached(path):
+    """Load the model without tensor data, reusing the cached copy if the model file is unchanged."""
+    import onnx
+
+    st = os.stat(path)
+    if st.st_size <= CACHE_THRESHOLD:
+        return load_model(path, False)
+
+    # <path hash>-<version hash>.onnx, so that stale copies of the same model can be found and removed
+    abspath = os.path.abspath(path)
+    path_hash = hashlib.blake2b(abspath.encode(), digest_size=8).hexdigest()
+    version = f"{abspath}:{st.st_mtime_ns}:{st.st_size}"
+    version_hash = hashlib.blake2b(version.encode(), digest_size=16).hexdigest()
+    cache_path = os.path.join(cache_dir(), f"{path_hash}-{version_hash}.onnx")
+    if os.path.exists(cache_path):
+        from google.protobuf.message import DecodeError
+
+        logger.debug("Loading model {} from cache {}".format(path, cache_path))
+        try:
+            m = onnx.load_model(cache_path, load_external_data=False)
+            if m.HasField('graph'):
+                return m
+            logger.warning("Ignoring empty cache {} of model {}".format(cache_path, path))
+        except (DecodeError, OSError) as e:
+            logger.warning("Ignoring broken cache {} of model {}: {}".format(cache_path, path, e))
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
+
+    m = load_model(path, False)
+    for t in m.graph.initializer:
+        for field in TENSOR_DATA_FIELDS:
+            t.ClearField(field)
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        for stale in glob.glob(os.path.join(cache_dir(), f"{path_hash}-*.onnx")):
+            logger.debug("Removing stale cache {}".format(stale))
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                # removed by a concurrent run
+                pass
+        # write to a file of our own so that concurrent runs never publish a partially written cache
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir(), prefix=f"{path_hash}-", suffix='.tmp')
+        os.close(fd)
+        onnx.save_model(m, tmp_path)
+        os.replace(tmp_path, cache_path)
+        logger.debug("Cached model {} as {}".format(path, cache_path))
+    except OSError as e:
+        logger.warning("Failed to cache model {}: {}".format(path, e))
+    finally:
+        # only left behind if the cache is not published
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return m
 
 
 def print_meta(m):
     print("Meta information")
-    print("-" * 80)
-    print("  IR Version: {}".format(m.ir_version))
-    print("  Opset Import: {}".format(m.opset_import))
-    print("  Producer name: {}".format(m.producer_name))
-    print("  Producer version: {}".format(m.producer_version))
-    print("  Domain: {}".format(m.domain))
-    print("  Doc string: {}".format(m.doc_string))
+    print(SEPARATOR)
+    print(f"  IR Version: {m.ir_version}")
+    print(f"  Opset Import: {m.opset_import}")
+    print(f"  Producer name: {m.producer_name}")
+    print(f"  Producer version: {m.producer_version}")
+    print(f"  Domain: {m.domain}")
+    print(f"  Doc string: {m.doc_string}")
     for i in m.metadata_props:
-        print("  meta.{} = {}", i.key, i.value)
+        print(f"  meta.{i.key} = {i.value}")
 
 
 def print_basic(g):
-    print("  Graph name: {}".format(len(g.name)))
-    print("  Graph inputs: {}".format(len(g.input)))
-    print("  Graph outputs: {}".format(len(g.output)))
-    print("  Nodes in total: {}".format(len(g.node)))
-    print("  ValueInfo in total: {}".format(len(g.value_info)))
-    print("  Initializers in total: {}".format(len(g.initializer)))
-    print("  Sparse Initializers in total: {}".format(len(g.sparse_initializer)))
-    print("  Quantization in total: {}".format(len(g.quantization_annotation)))
-
-
-def print_tensor(g, indices, names, detail):
-    print("Tensor information")
-    print("-" * 80)
+    print(f"  Graph name: {len(g.name)}")
+    print(f"  Graph inputs: {len(g.input)}")
+    print(f"  Graph outputs: {len(g.output)}")
+    print(f"  Nodes in total: {len(g.node)}")
+    print(f"  ValueInfo in total: {len(g.value_info)}")
+    print(f"  Initializers in total: {len(g.initializer)}")
+    print(f"  Sparse Initializers in total: {len(g.sparse_initializer)}")
+    print(f"  Quantization in total: {len(g.quantization_annotation)}")
+
+
+def print_tensor(g, indices, names, detail, full_data):
+    out = ["Tensor information", SEPARATOR]
+
+    # the tensors are indexed in the order of inputs, outputs, value_info and initializers
+    tensors = list(itertools.chain(g.input, g.output, g.value_info, g.initializer))
+    num_tensors = len(tensors)
+    num_value_info = num_tensors - len(g.initializer)
+
+    def format_tensor_with_indice(idx, detail):
+        if idx < num_value_info:
+            out.append(format_value_info(tensors[idx]))
+        else:
+            out.extend(format_initializer(tensors[idx], detail, full_data))
 
     if len(indices) > 0:
         for idx in indices:
-            printed = print_tensor_with_indice(g, idx, detail)
-            if not printed:
-                raise ValueError("indice {} out of range".format(idx))
-        return
-
-    # print with names
-    if len(names) > 0:
+            if not 0 <= idx < num_tensors:
+                raise ValueError(f"indices {idx} out of range, tensor in total {num_tensors}")
+            format_tensor_with_indice(idx, detail)
+    elif len(names) > 0:
+        vi_by_name = {t.name: t for t in g.value_info}
+        init_by_name = {t.name: t for t in g.initializer}
+        in_by_name = {t.name: t for t in g.input}
+        out_by_name = {t.name: t for t in g.output}
         for name in names:
-            printed = print_tensor_with_name(g, detail, name)
-            if not printed:
-                raise ValueError("No tensor found with name {}".format(name))
-        return
-
-    # print all tensors
-    for t in g.value_info:
-        print_value_info(t)
-    for t in g.initializer:
-        print_initializer(t, False)
+            if name in vi_by_name:
+                out.append(format_value_info(vi_by_name[name]))
+            elif name in init_by_name:
+                out.extend(format_initializer(init_by_name[name], detail, full_data))
+            elif name in in_by_name:
+                out.append(format_value_info(in_by_name[name]))
+            elif name in out_by_name:
+                out.append(format_value_info(out_by_name[name]))
+            else:
+                raise ValueError(f"No tensor found with name {name}")
+    else:
+        for idx in range(num_tensors):
+            format_tensor_with_indice(idx, False)
+
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def print_io(g):
-    print("Input information")
-    print("-" * 80)
-    for t in g.input:
-        print_value_info(t)
-    print("Output information")
-    print("-" * 80)
-    for t in g.output:
-        print_value_info(t)
-
-
-def print_value_info(t):
-    txt = "  ValueInfo \"{}\":".format(t.name)
-    txt += " type {},".format(dtype(t.type.tensor_type.elem_type))
-    txt += " shape {},".format(shape(t.type.tensor_type.shape))
-    print(txt)
-
-
-def print_initializer(t, detail):
-    txt = "  Initializer \"{}\":".format(t.name)
-    txt += " type {},".format(dtype(t.data_type))
-    txt += " shape {},".format(t.dims)
-    print(txt)
+    out = ["Input information", SEPARATOR]
+    out.extend(format_value_info(t) for t in g.input)
+    out.extend(["Output information", SEPARATOR])
+    out.extend(format_value_info(t) for t in g.output)
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+def format_value_info(t):
+    tt = t.type.tensor_type
+    txt = f'  ValueInfo "{t.name}":'
+    txt += f" type {dtype(tt.elem_type)},"
+    txt += f" shape {shape(tt.shape)},"
+    return txt
+
+
+def format_initializer(t, detail, full_data=False):
+    txt = f'  Initializer "{t.name}":'
+    txt += f" type {dtype(t.data_type)},"
+    txt += f" shape [{', '.join(map(str, t.dims))}],"
+    lines = [txt]
     if detail:
-        print("    float data: {}".format(t.float_data))
-
-
-def print_tensor_with_indice(g, idx, detail):
-    tensor_name = None
-    if idx < len(g.initializer):
-        print_initializer(g.initializer[idx], detail)
-        tensor_name = g.initializer[idx].name
-    if idx < len(g.value_info):
-        print_value_info(g.value_info[idx])
-        tensor_name = g.value_info[idx].name
-    return tensor_name is not None
-
-
-def print_tensor_with_name(g, detail, name):
-    for i in g.value_info:
-        if i.name == name:
-            print_value_info(i)
-            return True
-    for i in g.initializer:
-        if i.name == name:
-            print_initializer(i, detail)
-            return True
-    for i in g.input:
-        if i.name == name:
-            print_value_info(i)
-            return True
-    for i in g.output:
-        if i.name == name:
-            print_value_info(i)
-            return True
+        from onnx import numpy_helper
+
+        arr = numpy_helper.to_array(t)
+        data = arr.ravel()
+        if full_data or data.size <= 2 * SUMMARY_ITEMS:
+            lines.append(f"    data: {data.tolist()}")
+        else:
+            head = data[:SUMMARY_ITEMS].tolist()
+            tail = data[-SUMMARY_ITEMS:].tolist()
+            lines.append(f"    data: {head} ... {tail}")
+        if data.size > 0 and arr.dtype.kind in 'biuf':
+            lines.append(f"    min {arr.min()}, max {arr.max()}, mean {arr.mean()}")
+    return lines
+
+
+def format_node_line(n):
+    txt = f'  Node "{n.name}":'
+    txt += f' type "{n.op_type}",'
+    txt += f" inputs [{', '.join(n.input)}],"
+    txt += f" outputs [{', '.join(n.output)}]"
+    return txt
+
+
+def format_node(n, detail):
+    lines = [format_node_line(n)]
+    if detail and len(n.attribute) > 0:
+        lines.append(f"    attributes: {n.attribute}")
+    return lines
 
 
 def print_nodes(g, indices, names, detail):
-    print("Node information")
-    print("-" * 80)
-
-    def print_node(n, detail):
-        txt = "  Node \"{}\":".format(n.name)
-        txt += " type \"{}\",".format(n.op_type)
-        txt += " inputs \"{}\",".format(n.input)
-        txt += " outputs \"{}\"".format(n.output)
-        print(txt)
-        if detail and len(n.attribute) > 0:
-            print("    attributes: {}".format(n.attribute))
-
-    # print with indices
+    out = ["Node information", SEPARATOR]
+
     if len(indices) > 0:
+        num_nodes = len(g.node)
         for idx in indices:
-            if idx >= len(g.node):
-                raise ValueError("indices {} out of range, node in total {}".format(idx, len(g.node)))
-            print_node(g.node[idx], detail)
-        return
-
-    # print with names
-    if len(names) > 0:
-        found_any = False
-        for name in names:
-            for n in g.node:
-                if n.name == name:
-                    print_node(n, detail)
-                    found_any = True
+            if not 0 <= idx < num_nodes:
+                raise ValueError(f"indices {idx} out of range, node in total {num_nodes}")
+            out.extend(format_node(g.node[idx], detail))
+    elif len(names) > 0:
+        wanted = set(names)
+        for n in g.node:
+            if n.name in wanted:
+                out.extend(format_node(n, detail))
+                wanted.discard(n.name)
+                if len(wanted) == 0:
                     break
-        if not found_any:
-            raise ValueError("No node found with name {}".format(name))
-        return
+        if len(wanted) > 0:
+            raise ValueError(f"No node found with name {', '.join(sorted(wanted))}")
+    else:
+        import collections
+        import operator
 
-    import collections
+        ops = collections.Counter(map(operator.attrgetter('op_type'), g.node))
+        for op, count in ops.most_common():
+            out.append(f'  Node type "{op}" has: {count}')
 
-    ops = collections.Counter([node.op_type for node in g.node])
-    for op, count in ops.most_common():
-        print("  Node type \"{}\" has: {}".format(op, count))
+        out.append(SEPARATOR)
+        out.extend(map(format_node_line, g.node))
 
-    print("-" * 80)
-    for node in g.node:
-        print_node(node, False)
+    sys.stdout.write("\n".join(out) + "\n")
@@ -1,6 +1,5 @@
 import logging
 import os
-import onnx
 from onnxcli.common import SubCmd
 
 logger = logging.getLogger('onnxcli')
@@ -40,6 +39,8 @@ class OptimizeCmd(SubCmd):
             passes = args.passes
             logger.info("Running with passes: {}".format(passes))
 
+        import onnx
+
         model = onnx.load(args.input_path)
         optimized = onnxoptimizer.optimize(model, passes)
         onnx.save(optimized, args.output_path)
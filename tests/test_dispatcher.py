@@ -1,8 +1,12 @@
 import logging
+import os
 import shlex
+import shutil
 import subprocess as sp
 
-from onnxcli.dispatcher import dispatch_core
+import pytest
+
+from onnxcli.dispatcher import dispatch_core, _sniff_subcommand
 
 fmt = '%(asctime)s %(levelname).1s [%(name)s][%(filename)s:%(lineno)d] %(message)s'
 logging.basicConfig(format=fmt, level=logging.DEBUG)
@@ -21,8 +25,10 @@ cmds = [
     'inspect ./assets/tests/conv.float32.onnx --node --names output --detail',
     'inspect ./assets/tests/conv.float32.onnx --tensor --indices 0 --detail',
     'inspect ./assets/tests/conv.float32.onnx --tensor --names output --detail',
+    'inspect ./assets/tests/conv.float32.onnx --tensor --names Variable/read --detail --full-data',
     'inspect ./assets/tests/conv.float32.onnx --io',
     'inspect ./assets/tests/conv.float32.onnx',
+    'inspect ./assets/tests/conv.float32.onnx --check',
     'optimize ./assets/tests/conv.float32.onnx optimized.onnx',
     'setup',
     'setup --list',
@@ -36,6 +42,94 @@ def test_dispatch_core():
         dispatch_core(shlex.split(cmd))
 
 
+def test_inspect_invalid_args():
+    invalid_cmds = [
+        'inspect ./assets/tests/conv.float32.onnx --node --indices 0 --names output',
+        'inspect ./assets/tests/conv.float32.onnx --indices 0',
+        'inspect ./assets/tests/conv.float32.onnx --names output',
+        'inspect ./assets/tests/conv.float32.onnx --node --detail',
+        'inspect ./assets/tests/conv.float32.onnx --tensor --full-data',
+        'inspect ./assets/tests/conv.float32.onnx --tensor --indices -1',
+        'inspect ./assets/tests/conv.float32.onnx --node --indices -1',
+        'inspect ./assets/tests/conv.float32.onnx --tensor --indices 6',
+    ]
+    for cmd in invalid_cmds:
+        with pytest.raises(ValueError):
+            dispatch_core(shlex.split(cmd))
+
+
+def test_inspect_cache(tmp_path, monkeypatch, capsys):
+    import onnxcli.inspect
+
+    monkeypatch.setattr(onnxcli.inspect, 'CACHE_THRESHOLD', 0)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    model_path = tmp_path / 'conv.onnx'
+    shutil.copy('./assets/tests/conv.float32.onnx', model_path)
+    cache_dir = tmp_path / 'cache' / 'onnxcli'
+
+    outputs = []
+    for _ in range(2):
+        dispatch_core(['inspect', str(model_path), '--tensor'])
+        outputs.append(capsys.readouterr().out)
+    assert outputs[0] == outputs[1]
+    cached = list(cache_dir.glob('*.onnx'))
+    assert len(cached) == 1
+
+    # the stale copy is replaced once the model changes
+    st = os.stat(model_path)
+    os.utime(model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    dispatch_core(['inspect', str(model_path), '--tensor'])
+    assert capsys.readouterr().out == outputs[0]
+    recached = list(cache_dir.glob('*.onnx'))
+    assert len(recached) == 1 and recached != cached
+
+    # a broken cache is dropped and rebuilt
+    recached[0].write_bytes(b'\xff' * 64)
+    dispatch_core(['inspect', str(model_path), '--tensor'])
+    assert capsys.readouterr().out == outputs[0]
+    dispatch_core(['inspect', str(model_path), '--tensor'])
+    assert capsys.readouterr().out == outputs[0]
+    assert list(cache_dir.glob('*.onnx')) == recached
+    assert list(cache_dir.glob('*.tmp')) == []
+
+    # a failed write leaves neither the cache nor the temporary file behind
+    import onnx
+
+    def failing_save_model(model, f, *args, **kwargs):
+        with open(f, 'wb') as fp:
+            fp.write(b'partial')
+        raise OSError("disk full")
+
+    monkeypatch.setattr(onnx, 'save_model', failing_save_model)
+    os.utime(model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+    dispatch_core(['inspect', str(model_path), '--tensor'])
+    assert capsys.readouterr().out == outputs[0]
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_inspect_mmap(monkeypatch, capsys, caplog):
+    import onnxcli.inspect
+
+    cmd = shlex.split('inspect ./assets/tests/conv.float32.onnx --tensor --names Variable/read --detail')
+    dispatch_core(cmd)
+    expected = capsys.readouterr().out
+
+    monkeypatch.setattr(onnxcli.inspect, 'MMAP_THRESHOLD', 0)
+    with caplog.at_level(logging.DEBUG, logger='onnxcli'):
+        dispatch_core(cmd)
+    assert 'from memory map' in caplog.text
+    output = capsys.readouterr().out
+    assert output == expected
+    assert ' ... ' in output and 'mean' in output
+
+
+def test_sniff_subcommand():
+    assert _sniff_subcommand(shlex.split('inspect model.onnx --node')) == 'inspect'
+    assert _sniff_subcommand(shlex.split('--help')) is None
+    assert _sniff_subcommand(shlex.split('unknown model.onnx')) is None
+    assert _sniff_subcommand([]) is None
+
+
 def test_dispatch_cmd():
     for cmd in cmds:
         cmd = 'onnx ' + cmd
@@ -53,4 +147,6 @@ def test_dispatch_cmd():
 
 if __name__ == '__main__':
     test_dispatch_core()
+    test_inspect_invalid_args()
+    test_sniff_subcommand()
     test_dispatch_cmd()